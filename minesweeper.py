@@ -1,6 +1,7 @@
+import collections
+import functools
 import itertools
 import random
-import copy
 
 class Minesweeper():
     """
@@ -22,13 +23,20 @@ class Minesweeper():
                 row.append(False)
             self.board.append(row)
 
-        # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+        # Add mines randomly, drawing distinct cell indices in one pass
+        for index in random.sample(range(height * width), mines):
+            i, j = divmod(index, width)
+            self.mines.add((i, j))
+            self.board[i][j] = True
+
+        # The mines never move, so count each cell's nearby mines once up front
+        # by adding every mine to the counts of the cells around it
+        self.nearby = [[0] * self.width for i in range(self.height)]
+        for i, j in self.mines:
+            for row in self.nearby[max(0, i - 1):i + 2]:
+                for column in range(max(0, j - 1), min(self.width, j + 2)):
+                    row[column] += 1
+            self.nearby[i][j] -= 1
 
         # At first, player has found no mines
         self.mines_found = set()
@@ -38,15 +46,15 @@ class Minesweeper():
         Prints a text-based representation
         of where mines are located.
         """
-        for i in range(self.height):
-            print("--" * self.width + "-")
-            for j in range(self.width):
-                if self.board[i][j]:
-                    print("|X", end="")
-                else:
-                    print("| ", end="")
-            print("|")
-        print("--" * self.width + "-")
+        separator = "--" * self.width + "-"
+
+        # Build the whole board as one string so it is written in a single call
+        lines = []
+        for row in self.board:
+            lines.append(separator)
+            lines.append("".join("|X" if mine else "| " for mine in row) + "|")
+        lines.append(separator)
+        print("\n".join(lines))
 
     def is_mine(self, cell):
         i, j = cell
@@ -59,23 +67,43 @@ class Minesweeper():
         not including the cell itself.
         """
 
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
+        i, j = cell
+        return self.nearby[i][j]
 
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
+    def neighbours(self, cell):
+        """
+        Returns the cells within one row and column
+        of a given cell, not including the cell itself.
+        """
+        i, j = cell
+        return [
+            (y, x)
+            for y in range(max(0, i - 1), min(self.height, i + 2))
+            for x in range(max(0, j - 1), min(self.width, j + 2))
+            if (y, x) != cell
+        ]
+
+    def flood_reveal(self, cell):
+        """
+        Returns the set of cells revealed by clicking on a given safe
+        cell: the cell itself and, whenever a revealed cell has no
+        nearby mines, all of its neighbours in turn.
+        """
 
-        return count
+        # Breadth-first search with an explicit queue, so large empty
+        # regions don't recurse
+        revealed = {cell}
+        queue = collections.deque([cell])
+        while queue:
+            current = queue.popleft()
+            if self.is_mine(current) or self.nearby_mines(current) != 0:
+                continue
+            for neighbour in self.neighbours(current):
+                if neighbour not in revealed:
+                    revealed.add(neighbour)
+                    queue.append(neighbour)
+
+        return revealed
 
     def won(self):
         """
@@ -84,52 +112,126 @@ class Minesweeper():
         return self.mines_found == self.mines
 
 
+def iter_bits(mask):
+    """
+    Yields the index of each set bit in `mask`, lowest first.
+    """
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
+@functools.lru_cache(maxsize=None)
+def neighbour_masks(height, width):
+    """
+    Returns a tuple holding, for each packed cell index on a board of the
+    given size, the bitmask of the (up to) 8 cells surrounding it.
+
+    The table only depends on the board size, so it is built once and
+    shared by every AI playing on a board of that size.
+    """
+    masks = []
+    for row in range(height):
+        top = max(0, row - 1)
+        bottom = min(height, row + 2)
+        for column in range(width):
+            left = max(0, column - 1)
+            right = min(width, column + 2)
+
+            #Bits for the (clipped) 3 columns around the cell within one row
+            span = ((1 << (right - left)) - 1) << left
+
+            #Repeats the span on each surrounding row, then removes the cell itself
+            mask = 0
+            for y in range(top, bottom):
+                mask |= span << (y * width)
+            masks.append(mask & ~(1 << (row * width + column)))
+
+    return tuple(masks)
+
+
 class Sentence():
     """
     Logical statement about a Minesweeper game
     A sentence consists of a set of board cells,
     and a count of the number of those cells which are mines.
+
+    Cells are packed integer indices, held as a bitmask where
+    bit k is set iff cell k is part of the sentence.
     """
 
+    __slots__ = ("mask", "count", "dirty")
+
     def __init__(self, cells, count):
-        self.cells = set(cells)
+        self.mask = 0
+        for cell in cells:
+            self.mask |= 1 << cell
         self.count = count
 
+        # Whether the sentence is new or has changed since it was last
+        # checked for known mines and safes
+        self.dirty = True
+
+    @classmethod
+    def from_mask(cls, mask, count):
+        """
+        Builds a sentence directly from a cell bitmask.
+        """
+        sentence = cls((), count)
+        sentence.mask = mask
+        return sentence
+
+    @property
+    def cells(self):
+        """
+        The (read-only) set of cells in the sentence.
+        """
+        return frozenset(iter_bits(self.mask))
+
+    def __len__(self):
+        return self.mask.bit_count()
+
     def __eq__(self, other):
-        return self.cells == other.cells and self.count == other.count
+        if not isinstance(other, Sentence):
+            return NotImplemented
+        return self.mask == other.mask and self.count == other.count
+
+    def __hash__(self):
+        return hash((self.mask, self.count))
 
     def __str__(self):
-        return f"{self.cells} = {self.count}"
+        return f"{set(self.cells)} = {self.count}"
 
     def known_mines(self):
         """
-        Returns the set of all cells in self.cells known to be mines.
+        Returns the bitmask of all cells in the sentence known to be mines.
         """
 
         #If the number of cells is equal to number of mines (and there is at least one mine)
         #then all cells must be mines
 
-        mineCount = self.count        
-        
-        if (len(self.cells) == mineCount) and (mineCount > 0):
+        mineCount = self.count
+
+        if (len(self) == mineCount) and (mineCount > 0):
             #Returns all cells
-            return self.cells
-        
-        return set()
+            return self.mask
+
+        return 0
 
     def known_safes(self):
         """
-        Returns the set of all cells in self.cells known to be safe.
+        Returns the bitmask of all cells in the sentence known to be safe.
         """
 
         #If sentence contains no mines then all cells in sentence must be safe
 
         mineCount = self.count
-        
+
         if (mineCount == 0):
-            return self.cells
+            return self.mask
 
-        return set()
+        return 0
 
     def mark_mine(self, cell):
         """
@@ -137,21 +239,17 @@ class Sentence():
         a cell is known to be a mine.
         """
 
-        #Loops through cells
-        for item in self.cells:
-            #Checks to see if cell matches the "mine"
-            if (item == cell):
-                #Removes cell from sentence
-                self.cells.remove(cell)                
+        bit = 1 << cell
 
-                #Reduces the mine count by 1
-                if (self.count > 0):
-                    self.count -= 1
-                else:
-                    self.count = 0
+        #Checks to see if the "mine" is part of the sentence
+        if (self.mask & bit):
+            #Removes cell from sentence
+            self.mask ^= bit
+            self.dirty = True
 
-                return
-                
+            #Reduces the mine count by 1
+            if (self.count > 0):
+                self.count -= 1
 
     def mark_safe(self, cell):
         """
@@ -159,15 +257,12 @@ class Sentence():
         a cell is known to be safe.
         """
 
-        
-        #Loops through cells
-        for item in self.cells:
-            #Checks to see if cell matches the confimed "safe" cell
-            if (item == cell):
-                #Removes cell from sentence
-                self.cells.remove(cell)                
+        bit = 1 << cell
 
-                return
+        #Removes the confirmed "safe" cell from sentence if present
+        if (self.mask & bit):
+            self.mask ^= bit
+            self.dirty = True
 
 class MinesweeperAI():
     """
@@ -180,33 +275,88 @@ class MinesweeperAI():
         self.height = height
         self.width = width
 
+        # Cells are stored internally as packed integer indices
+        # (row * width + column), and sets of cells as bitmasks where
+        # bit k is set iff cell k is in the set
+
         # Keep track of which cells have been clicked on
-        self.moves_made = set()
+        self.moves_mask = 0
 
         # Keep track of cells known to be safe or mines
-        self.mines = set()
-        self.safes = set()
+        self.mines_mask = 0
+        self.safes_mask = 0
+
+        # Every cell on the board
+        self._board_mask = (1 << (height * width)) - 1
 
         # List of sentences about the game known to be true
         self.knowledge = []
 
+        # The (up to) 8 cells surrounding each cell, indexed by packed index
+        self._neighbours = neighbour_masks(height, width)
+
+    @property
+    def moves_made(self):
+        """
+        The set of (row, column) cells that have been clicked on.
+        """
+        return {self._unpack(index) for index in iter_bits(self.moves_mask)}
+
+    @property
+    def mines(self):
+        """
+        The set of (row, column) cells known to be mines.
+        """
+        return {self._unpack(index) for index in iter_bits(self.mines_mask)}
+
+    @property
+    def safes(self):
+        """
+        The set of (row, column) cells known to be safe.
+        """
+        return {self._unpack(index) for index in iter_bits(self.safes_mask)}
+
+    def _pack(self, cell):
+        """
+        Converts a (row, column) cell into its packed integer index.
+        """
+        return cell[0] * self.width + cell[1]
+
+    def _unpack(self, index):
+        """
+        Converts a packed integer index back into a (row, column) cell.
+        """
+        return divmod(index, self.width)
+
     def mark_mine(self, cell):
         """
         Marks a cell as a mine, and updates all knowledge
         to mark that cell as a mine as well.
         """
-        self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        self._mark_mine(self._pack(cell))
 
     def mark_safe(self, cell):
         """
         Marks a cell as safe, and updates all knowledge
         to mark that cell as safe as well.
         """
-        self.safes.add(cell)
+        self._mark_safe(self._pack(cell))
+
+    def _mark_mine(self, index):
+        """
+        Marks a cell, given as a packed index, as a mine.
+        """
+        self.mines_mask |= 1 << index
+        for sentence in self.knowledge:
+            sentence.mark_mine(index)
+
+    def _mark_safe(self, index):
+        """
+        Marks a cell, given as a packed index, as safe.
+        """
+        self.safes_mask |= 1 << index
         for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+            sentence.mark_safe(index)
 
     def add_knowledge(self, cell, count):
         """
@@ -224,82 +374,104 @@ class MinesweeperAI():
                if they can be inferred from existing knowledge
         """
 
+        #Converts the cell to its packed index
+        cell = self._pack(cell)
+
         #Marks the cell as a move that has been made
-        self.moves_made.add(cell)
+        self.moves_mask |= 1 << cell
         #Marks the cell as safe
-        self.mark_safe(cell)
+        self._mark_safe(cell)
+
+        #Marking a cell (here or through mark_mine/mark_safe since the last
+        #call) flags every sentence it changes, so the knowledge base is
+        #only still at its last fixed point if no sentence is flagged
+        changed = any(sentence.dirty for sentence in self.knowledge)
 
         #Creates new sentence and adds to AI's knowledge base
-        neighbours = set()
-
-        #Gets coords of current cell
-        row = cell[0]
-        column = cell[1]
-
-        #Checks all cells and identifies neighbours by checking cells within 1 cell
-        #of current cell
-        for x in range(0, self.width):
-            for y in range(0, self.height):
-                #Adds adjacent cells that haven't been set as safe              
-                if ((y,x) not in self.safes):
-                    if (abs(row - y) == 1) and (abs(column - x) == 1):
-                        neighbours.add((y, x))
-                    elif (abs(row - y) == 0) and (abs(column - x) == 1):
-                        neighbours.add((y, x))
-                    elif (abs(row - y) == 1) and (abs(column - x) == 0):
-                        neighbours.add((y, x))
-
-        #Creates new sentence using the new neighbours and adds to knowledge base
-        newSentence = Sentence(neighbours, count)
-        self.knowledge.append(newSentence)
-
-        #Mark additional cells as safe or as mines if concludable
-        for sentence in self.knowledge:
-            #Attempts to find known mines from sentence
-            mines = sentence.known_mines()
-            #Creates deep-copy of sentence
-            tempSentenceCells = copy.deepcopy(sentence.cells)
-
-            #Checks the sentence cells for mines and marks them if necessary
-            for cell in tempSentenceCells:
-                if (cell in mines):
-                    self.mark_mine(cell)
-
-            #Attempts to find known safes from sentence
-            safes = sentence.known_safes()
-
-            #Checks the sentence cells for safes and marks them if necessary
-            for cell in tempSentenceCells:
-                if (cell in safes):
-                    self.mark_safe(cell)
-
-        tempKnowledge = []
-        
-        #Creates new sentences using inference rules
-
-        #Gets two sentences from knowledge base
-        for first in self.knowledge:
-            for second in self.knowledge:                
-                #Checks if one sentence is a sub-set of the other
-                if first.cells.issubset(second.cells):
-                    #If the first and second sentences are the same then attempt is passed
-                    if (first.cells == second.cells):
-                        pass
-                    #If either of the sentences have zero mines then attempt is passed
-                    elif (first.count == 0) or (second.count == 0):
-                        pass
-                    #If either of the sentences have zero cells than attempt is passed
-                    elif (len(first.cells) == 0) or (len(second.cells) == 0):
-                        pass
-                    else:                       
-                        #Removes common cells and calculates new mine count to form a new sentence   
-                        newSentence = Sentence(second.cells - first.cells, second.count - first.count)
-                        tempKnowledge.append(newSentence)
-
-        #Adds new sentences to knowledge base
-        for sentence in tempKnowledge:
-            self.knowledge.append(sentence)
-                    
+        adjacent = self._neighbours[cell]
+
+        #Leaves out neighbours already resolved as safe or played, and known
+        #mines (which reduce the count of mines still unaccounted for)
+        neighbours = adjacent & ~(self.safes_mask | self.moves_mask | self.mines_mask)
+        adjustedCount = count - (adjacent & self.mines_mask).bit_count()
+
+        #Creates new sentence using the new neighbours and adds it to knowledge
+        #base if it says something that isn't already known
+        newSentence = Sentence.from_mask(neighbours, adjustedCount)
+        if newSentence.mask and (newSentence not in self.knowledge):
+            self.knowledge.append(newSentence)
+            changed = True
+
+        #Repeats the deductions below until a full pass neither marks a cell
+        #nor infers a new sentence (skipped entirely if nothing has changed
+        #since the last call)
+        while changed:
+            changed = False
+
+            #Mark additional cells as safe or as mines if concludable
+            for sentence in self.knowledge:
+                #A sentence that hasn't changed since it was last checked
+                #can't prove anything new
+                if not sentence.dirty:
+                    continue
+                sentence.dirty = False
+
+                #Marks the cells the sentence proves to be mines (the bitmask is a
+                #snapshot, so marking can safely remove them from the sentence)
+                for mine in iter_bits(sentence.known_mines()):
+                    self._mark_mine(mine)
+                    changed = True
+
+                #Marks the cells the sentence proves to be safe
+                for safe in iter_bits(sentence.known_safes()):
+                    self._mark_safe(safe)
+                    changed = True
+
+            #Prunes the knowledge base, dropping empty and duplicate sentences.
+            #Sentences hash by value, so the set is rebuilt on each pass as
+            #marking cells changes them
+            seen = set()
+            pruned = []
+            for sentence in self.knowledge:
+                if sentence.mask and (sentence not in seen):
+                    seen.add(sentence)
+                    pruned.append(sentence)
+            self.knowledge = pruned
+
+            tempKnowledge = []
+
+            #Creates new sentences using inference rules
+
+            #Gets each unordered pair of sentences from knowledge base
+            for first, second in itertools.combinations(self.knowledge, 2):
+                #Cells shared by both sentences
+                common = first.mask & second.mask
+
+                #Identical or disjoint sentences can't be proper sub-sets of each other
+                if (first.mask == second.mask) or not common:
+                    continue
+
+                #Checks if either sentence is a sub-set of the other, ordering the pair
+                #so that the sub-set comes first
+                if (common == first.mask):
+                    smaller, larger = first, second
+                elif (common == second.mask):
+                    smaller, larger = second, first
+                else:
+                    continue
+
+                #Removes common cells and calculates new mine count to form a new sentence
+                newSentence = Sentence.from_mask(larger.mask & ~smaller.mask, larger.count - smaller.count)
+
+                #Only keeps sentences that aren't already known
+                if (newSentence not in seen):
+                    seen.add(newSentence)
+                    tempKnowledge.append(newSentence)
+
+            #Adds new sentences to knowledge base, which may allow further deductions
+            if tempKnowledge:
+                self.knowledge.extend(tempKnowledge)
+                changed = True
 
     def make_safe_move(self):
         """
@@ -311,14 +483,13 @@ class MinesweeperAI():
         and self.moves_made, but should not modify any of those values.
         """
 
-        #Checks all the cells that are known to be safe and checks to see if there is one that
-        #hasn't been used yet
-        for cell in self.safes:
-            if (cell not in self.moves_made):
-                #Returns safe cell that hasn't been used
-                return cell
-        
-        return None
+        #Safe cells that haven't been used yet
+        candidates = self.safes_mask & ~self.moves_mask
+        if not candidates:
+            return None
+
+        #Returns the lowest such cell
+        return self._unpack((candidates & -candidates).bit_length() - 1)
 
     def make_random_move(self):
         """
@@ -328,13 +499,10 @@ class MinesweeperAI():
             2) are not known to be mines
         """
 
-        #Loops through all cells
-        for x in range(self.height):
-            for y in range(self.width):
-                cell = (x, y)
+        #Cells that aren't mines and that haven't been used yet
+        candidates = self._board_mask & ~(self.moves_mask | self.mines_mask)
+        if not candidates:
+            return None
 
-                #Returns a cell that isn't a mine and that hasn't been used yet
-                if (cell not in self.moves_made) and (cell not in self.mines):
-                    return cell
-        
-        return None
+        #Returns the lowest such cell
+        return self._unpack((candidates & -candidates).bit_length() - 1)